@@ -73,6 +73,33 @@ if [ ! -d "$SOURCE_THEMES_DIR" ]; then
     exit 1
 fi
 
+# Verificar el costo de renderizado de los temas antes de copiarlos
+# Presupuestos configurables: THEME_MAX_CSS_KB, THEME_MAX_RENDER_COST, THEME_WARN_RENDER_COST
+RENDER_COST_ANALYZER="$SCRIPT_DIR/utils/theme_render_cost.py"
+if command -v python3 > /dev/null 2>&1 && [ -f "$RENDER_COST_ANALYZER" ]; then
+    echo "Analizando costo de renderizado de los temas..."
+    # Códigos de salida: 0 = ok, 3 = presupuesto excedido, otro = error del analizador
+    RENDER_COST_STATUS=0
+    python3 "$RENDER_COST_ANALYZER" "$SOURCE_THEMES_DIR" \
+        --max-css-kb "${THEME_MAX_CSS_KB:-50}" \
+        --max-cost "${THEME_MAX_RENDER_COST:-500}" \
+        --warn-cost "${THEME_WARN_RENDER_COST:-250}" || RENDER_COST_STATUS=$?
+
+    if [ "$RENDER_COST_STATUS" -eq 0 ]; then
+        echo -e "${GREEN}✓ Todos los temas están dentro del presupuesto de renderizado${NC}"
+    elif [ "$RENDER_COST_STATUS" -eq 3 ]; then
+        echo -e "${RED}Error: Hay temas que exceden el presupuesto de renderizado${NC}"
+        echo "Reduce el CSS del tema o ajusta THEME_MAX_CSS_KB / THEME_MAX_RENDER_COST"
+        exit 1
+    else
+        echo -e "${RED}Error: El analizador de costo de renderizado falló (código $RENDER_COST_STATUS)${NC}"
+        echo "Revisa que los archivos JSON y CSS de los temas sean válidos"
+        exit 1
+    fi
+else
+    echo -e "${YELLOW}⚠ python3 no disponible, se omite el análisis de costo de renderizado${NC}"
+fi
+
 echo "Copiando temas desde: $SOURCE_THEMES_DIR"
 echo "Hacia: $TARGET_THEMES_DIR"
 
@@ -310,212 +337,44 @@ echo ""
 echo ""
 echo -e "${YELLOW}=== Instalando Theme Preview API ===${NC}"
 
-# Crear el archivo de extensión para el Theme Preview API
+# Copiar el Theme Preview API (incluye el precálculo de previews en segundo plano)
+THEME_EXTENSION_SOURCE="$SCRIPT_DIR/utils/theme_preview_api.py"
 THEME_EXTENSION_FILE="apps/$TARGET_APP/$TARGET_APP/theme_preview_api.py"
-echo "Creando Theme Preview API en: $THEME_EXTENSION_FILE"
-
-cat > "$THEME_EXTENSION_FILE" << 'EOF'
-"""
-Theme Preview API - Auto-generado por frappe-themes-submodule
-Proporciona endpoints para obtener datos de preview de temas
-"""
-
-import frappe
-import re
-import requests
-from urllib.parse import urljoin
-from frappe.utils import cstr
-
-
-@frappe.whitelist()
-def get_theme_preview_data(theme_name=None):
-    """
-    Endpoint principal para obtener datos de preview de temas
-    """
-    try:
-        if theme_name:
-            return get_single_theme_preview(theme_name)
-        else:
-            all_themes = []
-            
-            # Agregar temas por defecto
-            default_themes = get_default_themes()
-            all_themes.extend(default_themes)
-            
-            # Agregar temas personalizados
-            custom_themes = get_custom_themes()
-            all_themes.extend(custom_themes)
-            
-            return {
-                "status": "success",
-                "themes": all_themes,
-                "count": len(all_themes)
-            }
-            
-    except Exception as e:
-        frappe.log_error(f"Error in theme preview API: {str(e)}", "Theme Preview API")
-        return {
-            "status": "error",
-            "message": str(e),
-            "themes": get_default_themes()
-        }
-
-
-def get_default_themes():
-    """Temas por defecto de Frappe"""
-    return [
-        {
-            "name": "light",
-            "label": "Frappe Light",
-            "info": "Light Theme",
-            "is_custom": False,
-            "preview_colors": {
-                "primary": "#007bff",
-                "background": "#ffffff",
-                "text": "#212529",
-                "navbar": "#ffffff",
-                "sidebar": "#f8f9fa"
-            }
-        },
-        {
-            "name": "dark",
-            "label": "Timeless Night", 
-            "info": "Dark Theme",
-            "is_custom": False,
-            "preview_colors": {
-                "primary": "#5e72e4",
-                "background": "#1a1d29",
-                "text": "#ffffff",
-                "navbar": "#232631",
-                "sidebar": "#1a1d29"
-            }
-        },
-        {
-            "name": "automatic",
-            "label": "Automatic",
-            "info": "Uses system's theme",
-            "is_custom": False,
-            "preview_colors": {
-                "primary": "#007bff",
-                "background": "auto",
-                "text": "auto"
-            }
-        }
-    ]
-
-
-def get_custom_themes():
-    """Obtiene temas personalizados"""
-    custom_themes = []
-    
-    try:
-        website_themes = frappe.get_all(
-            "Website Theme",
-            fields=["name", "theme", "theme_url", "disabled"],
-            filters={"disabled": 0}
-        )
-        
-        for theme_doc in website_themes:
-            theme_name = cstr(theme_doc.get("theme", "")).lower()
-            if theme_name and theme_name not in ["light", "dark", "automatic"]:
-                preview_data = get_single_theme_preview(theme_name)
-                if preview_data:
-                    custom_themes.append(preview_data)
-                    
-    except Exception as e:
-        frappe.log_error(f"Error getting custom themes: {str(e)}", "Theme Preview API")
-    
-    return custom_themes
-
-
-def get_single_theme_preview(theme_name):
-    """Obtiene preview de un tema específico"""
-    try:
-        # Buscar tema en la base de datos
-        theme_docs = frappe.get_all(
-            "Website Theme",
-            fields=["name", "theme", "theme_url"],
-            filters={"disabled": 0}
-        )
-        
-        theme_doc = None
-        for doc in theme_docs:
-            if doc.get('theme', '').lower() == theme_name.lower():
-                theme_doc = frappe.get_doc("Website Theme", doc.name)
-                break
-        
-        if not theme_doc:
-            return None
-            
-        return {
-            "name": theme_name.lower(),
-            "label": theme_doc.get("theme") or theme_name,
-            "info": f"Custom theme: {theme_doc.get('theme') or theme_name}",
-            "is_custom": True,
-            "theme_url": theme_doc.get("theme_url"),
-            "preview_colors": extract_basic_colors(theme_doc.get("theme_url"))
-        }
-        
-    except Exception as e:
-        frappe.log_error(f"Error getting theme preview for {theme_name}: {str(e)}", "Theme Preview API")
-        return None
+echo "Copiando Theme Preview API en: $THEME_EXTENSION_FILE"
 
+if [ -f "$THEME_EXTENSION_SOURCE" ] && cp "$THEME_EXTENSION_SOURCE" "$THEME_EXTENSION_FILE"; then
+    echo -e "${GREEN}✓ Theme Preview API copiado exitosamente${NC}"
 
-def extract_basic_colors(theme_url):
-    """Extrae colores básicos de un tema"""
-    colors = {
-        "primary": "#007bff",
-        "background": "#ffffff", 
-        "text": "#212529"
-    }
-    
-    if not theme_url:
-        return colors
-    
-    try:
-        if theme_url.startswith('/'):
-            base_url = frappe.utils.get_url()
-            theme_url = urljoin(base_url, theme_url)
-        
-        response = requests.get(theme_url, timeout=5)
-        css_content = response.text
-        
-        # Buscar colores básicos
-        primary_match = re.search(r'--primary[^:]*:\s*([^;\n]+)', css_content, re.IGNORECASE)
-        if primary_match:
-            colors["primary"] = primary_match.group(1).strip()
-            
-        bg_match = re.search(r'background[^:]*:\s*([^;\n]+)', css_content, re.IGNORECASE)  
-        if bg_match:
-            colors["background"] = bg_match.group(1).strip()
-            
-    except Exception:
-        pass  # Usar colores por defecto
-    
-    return colors
-
-
-@frappe.whitelist()
-def validate_theme_preview_api():
-    """Valida que el API funcione"""
-    try:
-        result = get_theme_preview_data()
-        return {
-            "status": "success",
-            "message": "Theme Preview API is working",
-            "theme_count": len(result.get("themes", []))
-        }
-    except Exception as e:
-        return {
-            "status": "error",
-            "message": str(e)
-        }
+    # Verificar si ya tiene los doc_events del Theme Preview API
+    if grep -q "theme_preview_api.on_website_theme_update" "$HOOKS_FILE"; then
+        echo -e "${YELLOW}⚠ El hooks.py ya contiene los doc_events del Theme Preview API${NC}"
+    else
+        echo "Agregando doc_events de Website Theme al hooks.py..."
+        cat >> "$HOOKS_FILE" << EOF
+
+# Website Theme Preview Precompute (agregado por frappe-themes-submodule)
+# ----------------------------------------------------------------------
+if not globals().get('doc_events'):
+    doc_events = {}
+
+_website_theme_events = doc_events.setdefault("Website Theme", {})
+for _event, _handler in {
+    "on_update": "$TARGET_APP.theme_preview_api.on_website_theme_update",
+    "on_trash": "$TARGET_APP.theme_preview_api.on_website_theme_trash"
+}.items():
+    _existing = _website_theme_events.get(_event)
+    if not _existing:
+        _website_theme_events[_event] = _handler
+    elif isinstance(_existing, list):
+        _existing.append(_handler)
+    else:
+        _website_theme_events[_event] = [_existing, _handler]
 EOF
-
-if [ -f "$THEME_EXTENSION_FILE" ]; then
-    echo -e "${GREEN}✓ Theme Preview API creado exitosamente${NC}"
+        echo -e "${GREEN}✓ doc_events de Website Theme agregados al hooks.py${NC}"
+    fi
 else
-    echo -e "${RED}✗ Error creando Theme Preview API${NC}"
+    echo -e "${RED}✗ Error copiando Theme Preview API desde: $THEME_EXTENSION_SOURCE${NC}"
+    echo -e "${YELLOW}⚠ No se registran los doc_events de Website Theme en hooks.py${NC}"
 fi
 
 echo ""
@@ -535,4 +394,6 @@ echo ""
 echo -e "${BLUE}Para restaurar archivos originales:${NC}"
 echo -e "Theme switcher: ${YELLOW}cp ${THEME_SWITCHER_PATH}.original $THEME_SWITCHER_PATH${NC}"
 echo -e "Desk.js: ${YELLOW}cp ${DESK_PATH}.original $DESK_PATH${NC}"
-echo -e "Theme API: ${YELLOW}rm $THEME_EXTENSION_FILE${NC}"
\ No newline at end of file
+echo -e "Theme API (primero quita sus doc_events del hooks.py; si no, guardar o borrar un Website Theme fallará):"
+echo -e "  ${YELLOW}sed -i '/^# Website Theme Preview Precompute/,/_existing, _handler\]\$/d' $HOOKS_FILE${NC}"
+echo -e "  ${YELLOW}rm $THEME_EXTENSION_FILE${NC}"
\ No newline at end of file
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Frappe Themes Submodule - Load Test Harness
+Replays the desk theme boot sequence against a local stand-in server
+
+The stand-in server runs the real whitelisted methods of user_extension and
+theme_preview_api under /api/method/ (with a minimal frappe stub), serving
+the theme files from themes/. It runs in its own process, so its latency is
+not skewed by the client threads sharing the GIL. Every desk load replays the
+same per-app method probing done by desk.js (ThemeAutoLoader) and,
+optionally, theme_switcher_enhanced.js.
+
+Usage:
+    python3 utils/load_test.py --concurrency 500 --page-loads 2000
+    python3 utils/load_test.py --apps frappe,erpnext,frappe_ux_upgrade --open-switcher
+"""
+
+import argparse
+import http.client
+import importlib
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+THEMES_DIR = os.path.join(os.path.dirname(UTILS_DIR), "themes")
+
+# Package name under which the real utils/ modules are imported
+STAND_IN_PACKAGE = "frappe_themes_stand_in"
+
+DEFAULT_THEME_NAMES = ["light", "dark", "automatic"]
+
+# Hardcoded list used by ThemeSwitcher.fetch_themes_with_preview_api(). Nothing
+# in the shipped JS calls that method; --preview-api replays it as a synthetic
+# scenario to put load on theme_preview_api
+PREVIEW_API_APPS = [
+    "doctyped_cheatsheets",
+    "erpnext",
+    "hrms",
+    "wiki",
+    "lms",
+    "dragon_ball_app",
+    "job_cost_automator",
+]
+
+
+class StandInCache:
+    """
+    In-memory replacement for frappe.cache(), with the few RedisWrapper
+    methods theme_preview_api uses
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.hashes = {}
+
+    def make_key(self, key):
+        return key
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            current, expires_at = self.values.get(key, (None, None))
+            if nx and current is not None and (expires_at is None or expires_at > time.monotonic()):
+                return None
+            self.values[key] = (value, time.monotonic() + ex if ex else None)
+            return True
+
+    def delete_value(self, key):
+        with self.lock:
+            self.values.pop(key, None)
+
+    def hget(self, name, key):
+        with self.lock:
+            return self.hashes.get(name, {}).get(key)
+
+    def hgetall(self, name):
+        with self.lock:
+            return dict(self.hashes.get(name, {}))
+
+    def hset(self, name, key, value):
+        with self.lock:
+            self.hashes.setdefault(name, {})[key] = value
+
+    def hdel(self, name, key):
+        with self.lock:
+            self.hashes.get(name, {}).pop(key, None)
+
+
+def install_frappe_stub(saved_theme):
+    """
+    Puts a minimal `frappe` module in sys.modules, with just what
+    user_extension and theme_preview_api use outside of a site
+    """
+    logger = logging.getLogger("frappe_themes.load_test")
+
+    frappe = types.ModuleType("frappe")
+    frappe.whitelist = lambda *args, **kwargs: (lambda fn: fn)
+    frappe.logger = lambda *args, **kwargs: logger
+    frappe.log_error = lambda message=None, title=None, *args, **kwargs: logger.error("%s: %s", title, message)
+    frappe.session = types.SimpleNamespace(user="Administrator")
+    frappe.db = types.SimpleNamespace(
+        get_default=lambda key, parent=None: saved_theme,
+        set_default=lambda key, value, parent=None: None,
+        exists=lambda doctype, name=None: False
+    )
+
+    # No Website Theme documents; background jobs run on their own thread
+    # like an RQ worker would
+    cache = StandInCache()
+    frappe.cache = lambda: cache
+    frappe.get_all = lambda doctype, *args, **kwargs: []
+    frappe.enqueue = lambda method, queue=None, enqueue_after_commit=False, **kwargs: threading.Thread(
+        target=method, kwargs=kwargs, daemon=True
+    ).start()
+
+    sys.modules["frappe"] = frappe
+    return frappe
+
+
+def load_theme_modules(themes_dir=THEMES_DIR):
+    """
+    Imports the real user_extension and theme_preview_api modules.
+
+    user_extension looks for themes in website_theme/ next to its own file,
+    so __file__ is pointed at a temporary directory whose website_theme/ is
+    a symlink to `themes_dir`.
+    """
+    package = types.ModuleType(STAND_IN_PACKAGE)
+    package.__path__ = [UTILS_DIR]
+    sys.modules[STAND_IN_PACKAGE] = package
+
+    user_extension = importlib.import_module(f"{STAND_IN_PACKAGE}.user_extension")
+    theme_preview_api = importlib.import_module(f"{STAND_IN_PACKAGE}.theme_preview_api")
+
+    app_dir = tempfile.mkdtemp(prefix="frappe_themes_load_test_")
+    os.symlink(os.path.abspath(themes_dir), os.path.join(app_dir, "website_theme"))
+    user_extension.__file__ = os.path.join(app_dir, "user_extension.py")
+
+    return user_extension, theme_preview_api, app_dir
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers /api/method/<app>.<module>.<function> like a Frappe site where
+    only `theme_app` has the submodule installed
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.handle_method({})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        self.handle_method({key: values[-1] for key, values in parse_qs(body).items()})
+
+    def handle_method(self, args):
+        server = self.server
+        method = self.path.split("?", 1)[0].rsplit("/", 1)[-1]
+        app, _, function = method.partition(".")
+
+        handlers = {
+            "user_extension.get_available_themes": server.user_extension.get_available_themes,
+            "user_extension.get_desk_theme_preference": server.user_extension.get_desk_theme_preference,
+            "user_extension.save_desk_theme_preference": server.user_extension.save_desk_theme_preference,
+            "theme_preview_api.get_theme_preview_data": server.theme_preview_api.get_theme_preview_data,
+            "theme_preview_api.validate_theme_preview_api": server.theme_preview_api.validate_theme_preview_api,
+        }
+
+        if method == "ping":
+            self.send_json(200, {"message": "pong"})
+        elif app == server.theme_app and function in handlers:
+            self.send_json(200, {"message": handlers[function](**args)})
+        else:
+            self.send_json(404, {
+                "exc_type": "DoesNotExistError",
+                "exception": f"Failed to get method for command {method}"
+            })
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, theme_app, saved_theme):
+        super().__init__(address, StandInHandler)
+        self.theme_app = theme_app
+        self.saved_theme = saved_theme
+        install_frappe_stub(saved_theme)
+        self.user_extension, self.theme_preview_api, self.app_dir = load_theme_modules()
+
+    def server_close(self):
+        super().server_close()
+        shutil.rmtree(self.app_dir, ignore_errors=True)
+
+
+def serve_stand_in(theme_app, saved_theme, ready):
+    """
+    Stand-in server process entry point. Runs in its own process so its
+    request handling does not share the GIL with the client threads.
+    Sends the bound address back through `ready`.
+    """
+    # terminate() sends SIGTERM; exit through serve_forever() so server_close() runs
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = StandInServer(("127.0.0.1", 0), theme_app, saved_theme)
+    ready.send(server.server_address)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def start_stand_in(theme_app, saved_theme, timeout=30):
+    """
+    Starts the stand-in server in a separate process.
+
+    Returns:
+        tuple: (process, host, port)
+    """
+    ready, child_ready = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=serve_stand_in, args=(theme_app, saved_theme, child_ready), daemon=True
+    )
+    process.start()
+
+    if not ready.poll(timeout):
+        process.terminate()
+        raise RuntimeError("stand-in server did not start")
+
+    host, port = ready.recv()
+    return process, host, port
+
+
+class CountingHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTPConnection that counts every byte written to the socket, so request
+    header bytes can be measured alongside the body
+    """
+
+    bytes_sent = 0
+
+    def send(self, data):
+        self.bytes_sent += len(data)
+        super().send(data)
+
+
+def response_header_bytes(response):
+    # Status line, header lines and the blank line, as sent by the stand-in
+    lines = [f"HTTP/1.1 {response.status} {response.reason}"]
+    lines.extend(f"{name}: {value}" for name, value in response.getheaders())
+    return sum(len(line.encode("latin-1")) + 2 for line in lines) + 2
+
+
+class DeskClient:
+    """
+    One simulated browser tab. Replays the frappe.xcall() chains of desk.js
+    and theme_switcher_enhanced.js over a single keep-alive connection.
+    """
+
+    def __init__(self, host, port, installed_apps):
+        self.connection = CountingHTTPConnection(host, port, timeout=30)
+        self.installed_apps = installed_apps
+        self.samples = []
+        self.connect_times = []
+
+    def connect(self):
+        """
+        Opens the connection and waits until the server has accepted it (a
+        `ping` round trip), timed separately so connection setup and accept
+        queue wait are not charged to whichever endpoint is called first
+        """
+        start = time.perf_counter()
+        try:
+            self.connection.connect()
+            self.connection.request("GET", "/api/method/ping")
+            self.connection.getresponse().read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return
+        self.connect_times.append(time.perf_counter() - start)
+
+    def xcall(self, method, args=None):
+        body = urlencode(args or {}).encode("utf-8")
+        status = 0
+        payload = b""
+        header_bytes = 0
+        start = time.perf_counter()
+
+        try:
+            if self.connection.sock is None:
+                self.connect()
+                start = time.perf_counter()
+            sent_before = self.connection.bytes_sent
+            self.connection.request("POST", f"/api/method/{method}", body=body, headers={
+                "Content-Type": "application/x-www-form-urlencoded"
+            })
+            header_bytes = self.connection.bytes_sent - sent_before - len(body)
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+            header_bytes += response_header_bytes(response)
+        except (OSError, http.client.HTTPException):
+            # Like a failed frappe.xcall(): record it and let the caller try the next app
+            self.connection.close()
+
+        self.samples.append({
+            "endpoint": method,
+            "status": status,
+            "latency": time.perf_counter() - start,
+            "header_bytes": header_bytes,
+            "body_bytes": len(body) + len(payload)
+        })
+
+        if status != 200:
+            return None
+        return json.loads(payload).get("message")
+
+    def probe(self, methods, accept, args=None):
+        # Same as try_*_methods(): stop at the first app whose answer is accepted
+        for method in methods:
+            result = self.xcall(method, args)
+            if accept(result):
+                return result
+        return None
+
+    def app_methods(self, suffix):
+        return [f"{app}.{suffix}" for app in self.installed_apps]
+
+    def load_theme_preference(self):
+        result = self.probe(
+            self.app_methods("user_extension.get_desk_theme_preference"),
+            lambda r: bool(r and r.get("status") == "success" and r.get("theme"))
+        )
+        return result.get("theme") if result else None
+
+    def fetch_available_themes(self):
+        return self.probe(
+            self.app_methods("user_extension.get_available_themes"),
+            lambda r: bool(r)
+        ) or []
+
+    def desk_boot(self):
+        """
+        desk.js: ThemeAutoLoader.auto_load_saved_theme()
+        """
+        saved_theme = self.load_theme_preference()
+        if saved_theme and saved_theme not in DEFAULT_THEME_NAMES:
+            self.fetch_available_themes()
+
+    def open_switcher(self, switch_to=None):
+        """
+        theme_switcher_enhanced.js: ThemeSwitcher.refresh() and, when a theme
+        is picked, save_theme_preference()
+        """
+        self.load_theme_preference()
+        themes = self.fetch_available_themes()
+
+        if switch_to and any(t.get("name") == switch_to for t in themes):
+            self.probe(
+                self.app_methods("user_extension.save_desk_theme_preference"),
+                lambda r: bool(r and r.get("status") == "success"),
+                {"theme_name": switch_to}
+            )
+
+    def fetch_preview_api(self):
+        """
+        theme_switcher_enhanced.js: ThemeSwitcher.fetch_themes_with_preview_api().
+        Synthetic: not part of the real client sequence (nothing calls it)
+        """
+        self.probe(
+            [f"{app}.theme_preview_api.get_theme_preview_data" for app in PREVIEW_API_APPS],
+            lambda r: bool(r and (r.get("status") == "success" or r.get("themes")))
+        )
+
+    def close(self):
+        self.connection.close()
+
+
+def run_page_load(host, port, options):
+    client = DeskClient(host, port, options.apps)
+    try:
+        client.connect()
+        client.desk_boot()
+        if options.open_switcher:
+            client.open_switcher(options.switch_to)
+        if options.preview_api:
+            client.fetch_preview_api()
+    finally:
+        client.close()
+    return client.samples, client.connect_times
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def latency_summary(latencies):
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def build_report(results, duration):
+    endpoints = {}
+    connect_times = []
+    for samples, page_connect_times in results:
+        connect_times.extend(page_connect_times)
+        for sample in samples:
+            stats = endpoints.setdefault(sample["endpoint"], {
+                "latencies": [], "header_bytes": 0, "body_bytes": 0, "requests": 0, "errors": 0
+            })
+            stats["latencies"].append(sample["latency"])
+            stats["header_bytes"] += sample["header_bytes"]
+            stats["body_bytes"] += sample["body_bytes"]
+            stats["requests"] += 1
+            if sample["status"] != 200:
+                stats["errors"] += 1
+
+    page_loads = len(results)
+    total_requests = sum(len(samples) for samples, _ in results)
+    total_header_bytes = sum(s["header_bytes"] for samples, _ in results for s in samples)
+    total_body_bytes = sum(s["body_bytes"] for samples, _ in results for s in samples)
+
+    return {
+        "page_loads": page_loads,
+        "duration_sec": round(duration, 3),
+        "requests_per_page_load": round(total_requests / page_loads, 2) if page_loads else 0,
+        "bytes_per_page_load": round((total_header_bytes + total_body_bytes) / page_loads) if page_loads else 0,
+        "header_bytes_per_page_load": round(total_header_bytes / page_loads) if page_loads else 0,
+        "body_bytes_per_page_load": round(total_body_bytes / page_loads) if page_loads else 0,
+        "total_header_bytes": total_header_bytes,
+        "total_body_bytes": total_body_bytes,
+        "connect": dict(
+            connections=len(connect_times),
+            **(latency_summary(connect_times) if connect_times else {})
+        ),
+        "endpoints": {
+            endpoint: dict(
+                requests=stats["requests"],
+                errors=stats["errors"],
+                header_bytes=stats["header_bytes"],
+                body_bytes=stats["body_bytes"],
+                **latency_summary(stats["latencies"])
+            )
+            for endpoint, stats in sorted(endpoints.items())
+        }
+    }
+
+
+def print_report(report):
+    connect = report["connect"]
+    print(f"Page loads:                  {report['page_loads']} in {report['duration_sec']}s")
+    print(f"Requests per page load:      {report['requests_per_page_load']}")
+    print(f"Bytes per page load:         {report['bytes_per_page_load']} "
+          f"(headers {report['header_bytes_per_page_load']}, bodies {report['body_bytes_per_page_load']})")
+    print("")
+    print(f"{'Endpoint':<60} {'reqs':>7} {'errors':>7} {'hdr bytes':>10} {'body bytes':>11} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    if connect["connections"]:
+        print(f"{'(connect)':<60} {connect['connections']:>7} {'':>7} {'':>10} {'':>11} "
+              f"{connect['p50_ms']:>8} {connect['p95_ms']:>8} {connect['p99_ms']:>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<60} {stats['requests']:>7} {stats['errors']:>7} {stats['header_bytes']:>10} "
+              f"{stats['body_bytes']:>11} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}")
+
+
+def check_budgets(report, options):
+    failures = []
+    if options.max_requests is not None and report["requests_per_page_load"] > options.max_requests:
+        failures.append(f"requests per page load {report['requests_per_page_load']} > {options.max_requests}")
+    if options.max_bytes is not None and report["bytes_per_page_load"] > options.max_bytes:
+        failures.append(f"bytes per page load {report['bytes_per_page_load']} > {options.max_bytes}")
+    if options.max_body_bytes is not None and report["body_bytes_per_page_load"] > options.max_body_bytes:
+        failures.append(f"body bytes per page load {report['body_bytes_per_page_load']} > {options.max_body_bytes}")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the desk theme boot sequence")
+    parser.add_argument("--concurrency", type=int, default=500,
+                        help="simultaneous desk loads (default: 500)")
+    parser.add_argument("--page-loads", type=int, default=None,
+                        help="total desk loads to replay (default: same as --concurrency)")
+    parser.add_argument("--apps", default="frappe,frappe_ux_upgrade",
+                        help="frappe.boot.installed_apps, in order, comma separated")
+    parser.add_argument("--theme-app", default="frappe_ux_upgrade",
+                        help="app where the submodule is installed")
+    parser.add_argument("--saved-theme", default="ocean_blue_desk",
+                        help="theme returned by get_desk_theme_preference")
+    parser.add_argument("--open-switcher", action="store_true",
+                        help="also replay opening the theme switcher (Ctrl+Shift+G)")
+    parser.add_argument("--switch-to", default=None,
+                        help="theme picked in the switcher, triggers save_desk_theme_preference")
+    parser.add_argument("--preview-api", action="store_true",
+                        help="synthetic: also replay fetch_themes_with_preview_api() probing, "
+                             "which the shipped JS never calls")
+    parser.add_argument("--max-requests", type=float, default=None,
+                        help="fail if requests per page load exceed this budget")
+    parser.add_argument("--max-bytes", type=int, default=None,
+                        help="fail if bytes transferred (headers plus bodies) per page load exceed this budget")
+    parser.add_argument("--max-body-bytes", type=int, default=None,
+                        help="fail if request and response body bytes per page load exceed this budget")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    options = parser.parse_args(argv)
+    options.apps = [app.strip() for app in options.apps.split(",") if app.strip()]
+    if options.page_loads is None:
+        options.page_loads = options.concurrency
+    return options
+
+
+def main(argv=None):
+    options = parse_args(argv)
+
+    if options.preview_api and options.theme_app not in PREVIEW_API_APPS:
+        print(f"Warning: --theme-app {options.theme_app} is not probed by fetch_themes_with_preview_api() "
+              f"({', '.join(PREVIEW_API_APPS)}); every --preview-api call will be a 404", file=sys.stderr)
+
+    process, host, port = start_stand_in(options.theme_app, options.saved_theme)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+            results = list(executor.map(
+                lambda _: run_page_load(host, port, options), range(options.page_loads)
+            ))
+        duration = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.join()
+
+    report = build_report(results, duration)
+
+    if options.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+    failures = check_budgets(report, options)
+    for failure in failures:
+        print(f"Budget exceeded: {failure}", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
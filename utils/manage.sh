@@ -84,6 +84,7 @@ uninstall_themes() {
     fi
     
     echo "  ⚠ NOTA: Debes eliminar manualmente las líneas de fixtures del hooks.py"
+    echo "  y el bloque de doc_events 'Website Theme Preview Precompute' antes de borrar theme_preview_api.py"
     echo "  Archivo: apps/$app_name/$app_name/hooks.py"
 }
 
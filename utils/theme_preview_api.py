@@ -4,12 +4,23 @@ Frappe Themes Submodule - Theme Preview API
 Specific endpoint for obtaining theme preview data
 """
 
+import hashlib
 import re
 from urllib.parse import urljoin
 
 import frappe
 import requests
 
+# Hash del cache del sitio con los previews precalculados de Website Theme
+PREVIEW_CACHE_KEY = "frappe_themes_preview"
+
+# Hash del cache del sitio con los previews precalculados de los temas de desk,
+# indexado por el content_hash de su CSS
+DESK_PREVIEW_CACHE_KEY = "frappe_themes_desk_preview"
+
+# Segundos durante los cuales no se vuelve a encolar el mismo tema
+PREVIEW_PENDING_TTL = 60
+
 
 @frappe.whitelist()
 def get_theme_preview_data(theme_name=None):
@@ -188,7 +199,8 @@ def get_default_themes_preview():
 
 def get_custom_themes_preview():
     """
-    Obtiene datos de preview para temas personalizados incluyendo desk themes
+    Obtiene datos de preview para temas personalizados: temas de desk y Website Themes.
+    Solo se leen resultados precalculados del cache del sitio
     """
     custom_themes = []
 
@@ -197,27 +209,66 @@ def get_custom_themes_preview():
         from .user_extension import get_available_themes
 
         available_themes = get_available_themes()
+        cached_previews = frappe.cache().hgetall(DESK_PREVIEW_CACHE_KEY) or {}
 
         for theme_info in available_themes:
             theme_name = theme_info.get('name')
             if theme_name:
-                # Crear preview data para tema de desk
-                preview_data = create_desk_theme_preview(theme_info)
+                preview_data = get_desk_theme_preview(theme_info, cached_previews)
                 if preview_data:
                     custom_themes.append(preview_data)
-     
+
     except Exception as e:
         frappe.log_error(f"Error getting custom themes preview: {str(e)}", "Frappe Themes Preview API")
 
+    custom_themes.extend(get_website_themes_preview())
+
     return custom_themes
 
 
+def get_desk_theme_preview(theme_info, cached_previews):
+    """
+    Devuelve el preview precalculado de un tema de desk; en cache miss encola
+    el precálculo y devuelve colores por defecto
+    """
+    css_content = theme_info.get('css_content', '')
+    content_hash = get_css_content_hash(css_content)
+    cached_preview = cached_previews.get(content_hash)
+
+    if cached_preview:
+        # Varios temas pueden compartir CSS: nombre y label salen del tema
+        preview_data = dict(cached_preview)
+        preview_data.update(get_desk_theme_identity(theme_info))
+        return preview_data
+
+    # Sin precálculo todavía: encolar y devolver colores por defecto
+    enqueue_desk_theme_previews()
+
+    pending_preview = create_desk_theme_preview(dict(theme_info, css_content=""))
+    if pending_preview:
+        pending_preview["css_content_preview"] = css_content[:500] if css_content else ""
+        pending_preview["content_hash"] = content_hash
+        pending_preview["preview_pending"] = True
+    return pending_preview
+
+
+def get_desk_theme_identity(theme_info):
+    """
+    Nombre, label e info de un tema de desk
+    """
+    theme_name = theme_info.get('name', '')
+    return {
+        "name": theme_name.lower(),
+        "label": theme_info.get('label', theme_name),
+        "info": theme_info.get('info', f"Desk theme: {theme_name}")
+    }
+
+
 def create_desk_theme_preview(theme_info):
     """
     Crea datos de preview para un tema de desk desde theme_info
     """
     try:
-        theme_name = theme_info.get('name', '')
         css_content = theme_info.get('css_content', '')
 
         # Extraer colores del CSS content
@@ -225,17 +276,17 @@ def create_desk_theme_preview(theme_info):
         css_variables = extract_css_variables(css_content)
         preview_components = generate_preview_components(extracted_colors)
 
-        return {
-            "name": theme_name.lower(),
-            "label": theme_info.get('label', theme_name),
-            "info": theme_info.get('info', f"Desk theme: {theme_name}"),
+        preview_data = get_desk_theme_identity(theme_info)
+        preview_data.update({
             "is_custom": True,
             "is_desk_theme": True,
             "css_content_preview": css_content[:500] if css_content else "",
             "preview_colors": extracted_colors,
             "css_variables": css_variables,
-            "preview_components": preview_components
-        }
+            "preview_components": preview_components,
+            "content_hash": get_css_content_hash(css_content)
+        })
+        return preview_data
 
     except Exception as e:
         theme_name_safe = theme_info.get('name', 'unknown')
@@ -259,53 +310,246 @@ def get_single_theme_preview(theme_name):
 
         # Buscar tema personalizado en la base de datos
         try:
-            # Buscar por nombre del tema
             theme_docs = frappe.get_all(
                 "Website Theme",
-                fields=["name", "theme", "theme_url", "disabled"],
+                fields=["name", "theme", "theme_url"],
                 filters={"disabled": 0}
             )
 
-            theme_doc = None
+            theme_entry = None
             for doc in theme_docs:
-                if doc.get('theme', '').lower() == theme_name_lower:
-                    theme_doc = frappe.get_doc("Website Theme", doc.name)
+                if (doc.get('theme') or '').lower() == theme_name_lower:
+                    theme_entry = doc
                     break
 
-            if not theme_doc:
+            if not theme_entry:
                 return None
- 
+
         except Exception:
             return None
 
-        # Extraer datos del tema personalizado
+        # Solo se leen resultados precalculados; nunca se descarga CSS aquí
+        cached_preview = frappe.cache().hget(PREVIEW_CACHE_KEY, theme_entry.name)
+        return get_website_theme_preview(theme_entry, cached_preview)
+
+    except Exception as e:
+        frappe.log_error(f"Error getting preview for theme {theme_name}: {str(e)}", "Frappe Themes Preview API")
+        return None
+
+
+def get_website_themes_preview():
+    """
+    Obtiene los previews precalculados de los Website Themes habilitados
+    """
+    website_themes = []
+
+    try:
+        theme_docs = frappe.get_all(
+            "Website Theme",
+            fields=["name", "theme", "theme_url"],
+            filters={"disabled": 0}
+        )
+        cached_previews = frappe.cache().hgetall(PREVIEW_CACHE_KEY) or {}
+
+        for theme_doc in theme_docs:
+            theme_name = (theme_doc.get("theme") or "").lower()
+            if theme_name and theme_name not in ["light", "dark", "automatic"]:
+                website_themes.append(
+                    get_website_theme_preview(theme_doc, cached_previews.get(theme_doc.name))
+                )
+
+    except Exception as e:
+        frappe.log_error(f"Error getting Website Theme previews: {str(e)}", "Frappe Themes Preview API")
+
+    return website_themes
+
+
+def get_website_theme_preview(theme_doc, cached_preview):
+    """
+    Devuelve el preview precalculado de un Website Theme; en cache miss encola
+    el precálculo y devuelve colores por defecto
+    """
+    if cached_preview:
+        return cached_preview
+
+    # Sin precálculo todavía: encolar y devolver colores por defecto
+    enqueue_theme_preview(theme_doc.name)
+
+    pending_preview = build_website_theme_preview(theme_doc, "")
+    pending_preview["preview_pending"] = True
+    return pending_preview
+
+
+def build_website_theme_preview(theme_doc, css_content):
+    """
+    Construye los datos de preview de un Website Theme a partir de su CSS
+    """
+    theme_label = theme_doc.get("theme") or theme_doc.get("name")
+
+    # Extraer colores y variables del CSS
+    extracted_colors = extract_colors_from_css(css_content)
+    css_variables = extract_css_variables(css_content)
+    preview_components = generate_preview_components(extracted_colors)
+
+    return {
+        "name": theme_label.lower(),
+        "label": theme_label,
+        "info": f"Custom theme: {theme_label}",
+        "is_custom": True,
+        "is_desk_theme": True,  # Asumimos que es para desk
+        "theme_url": theme_doc.get("theme_url"),
+        "css_content_preview": css_content[:500] if css_content else "",  # Solo un preview
+        "preview_colors": extracted_colors,
+        "css_variables": css_variables,
+        "preview_components": preview_components,
+        "content_hash": get_css_content_hash(css_content)
+    }
+
+
+def get_css_content_hash(css_content):
+    """
+    Hash del contenido CSS para detectar si el preview precalculado sigue vigente
+    """
+    return hashlib.sha256((css_content or "").encode("utf-8")).hexdigest()
+
+
+def get_preview_pending_key(theme_docname):
+    """
+    Clave del marcador que indica que el preview de un tema ya está encolado
+    """
+    return f"{PREVIEW_CACHE_KEY}:pending:{theme_docname}"
+
+
+def acquire_preview_pending_marker(pending_key):
+    """
+    Toma el marcador de forma atómica (SET NX EX) para que varios workers con
+    cache miss simultáneo no encolen el mismo job. Devuelve False si ya estaba tomado
+    """
+    cache = frappe.cache()
+    return bool(cache.set(cache.make_key(pending_key), 1, nx=True, ex=PREVIEW_PENDING_TTL))
+
+
+def enqueue_theme_preview(theme_docname, after_commit=False):
+    """
+    Encola el precálculo del preview de un Website Theme.
+    Un marcador temporal evita encolar el mismo tema repetidamente. Con
+    after_commit no se usa el marcador: si la transacción hace rollback el
+    job no se encola y el marcador bloquearía los cache miss de ese tema.
+    """
+    if not after_commit and not acquire_preview_pending_marker(get_preview_pending_key(theme_docname)):
+        return
+
+    frappe.enqueue(
+        precompute_theme_preview,
+        queue="short",
+        theme_docname=theme_docname,
+        enqueue_after_commit=after_commit
+    )
+
+
+def precompute_theme_preview(theme_docname):
+    """
+    Background job: descarga el CSS del tema, extrae los datos de preview
+    y los guarda en el cache del sitio junto con el hash del contenido
+    """
+    pending_key = get_preview_pending_key(theme_docname)
+
+    try:
+        if not frappe.db.exists("Website Theme", theme_docname):
+            frappe.cache().hdel(PREVIEW_CACHE_KEY, theme_docname)
+            return
+
+        theme_doc = frappe.get_doc("Website Theme", theme_docname)
+        if theme_doc.get("disabled"):
+            frappe.cache().hdel(PREVIEW_CACHE_KEY, theme_docname)
+            return
+
         css_content = ""
         theme_url = theme_doc.get("theme_url")
 
         if theme_url:
             css_content = fetch_css_content(theme_url)
 
-        # Extraer colores y variables del CSS
-        extracted_colors = extract_colors_from_css(css_content)
-        css_variables = extract_css_variables(css_content)
-        preview_components = generate_preview_components(extracted_colors)
+        # Evitar volver a parsear si el CSS no ha cambiado
+        cached_preview = frappe.cache().hget(PREVIEW_CACHE_KEY, theme_docname)
+        if (cached_preview
+                and cached_preview.get("content_hash") == get_css_content_hash(css_content)
+                and cached_preview.get("label") == (theme_doc.get("theme") or theme_docname)
+                and cached_preview.get("theme_url") == theme_url):
+            return
 
-        return {
-            "name": theme_name_lower,
-            "label": theme_doc.get("theme") or theme_name,
-            "info": f"Custom theme: {theme_doc.get('theme') or theme_name}",
-            "is_custom": True,
-            "is_desk_theme": True,  # Asumimos que es para desk
-            "theme_url": theme_url,
-            "css_content_preview": css_content[:500] if css_content else "",  # Solo un preview
-            "preview_colors": extracted_colors,
-            "css_variables": css_variables,
-            "preview_components": preview_components
-        }
+        preview_data = build_website_theme_preview(theme_doc, css_content)
+        frappe.cache().hset(PREVIEW_CACHE_KEY, theme_docname, preview_data)
 
     except Exception as e:
-        frappe.log_error(f"Error getting preview for theme {theme_name}: {str(e)}", "Frappe Themes Preview API")
-        return None
+        frappe.log_error(f"Error precomputing preview for theme {theme_docname}: {str(e)}",
+                         "Frappe Themes Preview API")
+
+    finally:
+        frappe.cache().delete_value(pending_key)
+
+
+def enqueue_desk_theme_previews():
+    """
+    Encola el precálculo de los previews de los temas de desk.
+    Un marcador temporal evita encolarlo repetidamente.
+    """
+    if not acquire_preview_pending_marker(get_preview_pending_key(DESK_PREVIEW_CACHE_KEY)):
+        return
+
+    frappe.enqueue(precompute_desk_theme_previews, queue="short")
+
+
+def precompute_desk_theme_previews():
+    """
+    Background job: extrae los datos de preview de los temas de desk y los
+    guarda en el cache del sitio indexados por el hash de su CSS
+    """
+    pending_key = get_preview_pending_key(DESK_PREVIEW_CACHE_KEY)
+
+    try:
+        from .user_extension import get_available_themes
+
+        cached_previews = frappe.cache().hgetall(DESK_PREVIEW_CACHE_KEY) or {}
+        current_hashes = set()
+
+        for theme_info in get_available_themes():
+            content_hash = get_css_content_hash(theme_info.get('css_content', ''))
+            current_hashes.add(content_hash)
+
+            # Evitar volver a parsear si el CSS no ha cambiado
+            if content_hash in cached_previews:
+                continue
+
+            preview_data = create_desk_theme_preview(theme_info)
+            if preview_data:
+                frappe.cache().hset(DESK_PREVIEW_CACHE_KEY, content_hash, preview_data)
+
+        # Eliminar previews de CSS que ya no usa ningún tema
+        for content_hash in set(cached_previews) - current_hashes:
+            frappe.cache().hdel(DESK_PREVIEW_CACHE_KEY, content_hash)
+
+    except Exception as e:
+        frappe.log_error(f"Error precomputing desk theme previews: {str(e)}",
+                         "Frappe Themes Preview API")
+
+    finally:
+        frappe.cache().delete_value(pending_key)
+
+
+def on_website_theme_update(doc, method=None):
+    """
+    doc_event de Website Theme (on_update): recalcula el preview en segundo plano
+    """
+    enqueue_theme_preview(doc.name, after_commit=True)
+
+
+def on_website_theme_trash(doc, method=None):
+    """
+    doc_event de Website Theme (on_trash): elimina el preview precalculado
+    """
+    frappe.cache().hdel(PREVIEW_CACHE_KEY, doc.name)
+    frappe.cache().delete_value(get_preview_pending_key(doc.name))
 
 
 def fetch_css_content(theme_url):
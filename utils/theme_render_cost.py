@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Frappe Themes Submodule - Theme Render Cost Analyzer
+Scores desk theme CSS for constructs that slow down desk rendering
+
+Parses CSS with the same lightweight approach as theme_preview_api (no CSS
+library), but has no frappe dependency so install.sh can run it before
+copying the themes.
+
+Usage:
+    python3 utils/theme_render_cost.py themes/
+    python3 utils/theme_render_cost.py themes/ocean_blue_desk --max-cost 400 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+# Default budgets, overridable from the command line (and from install.sh)
+DEFAULT_MAX_CSS_KB = 50
+DEFAULT_WARN_COST = 250
+DEFAULT_MAX_COST = 500
+DEFAULT_MAX_SELECTOR_DEPTH = 3
+
+# Exit codes, checked by install.sh. Anything else (e.g. a traceback's 1)
+# is also an analyzer error.
+EXIT_OK = 0
+EXIT_ANALYZER_ERROR = 2
+EXIT_BUDGET_EXCEEDED = 3
+
+# Weight of every occurrence in the final render cost score
+COST_WEIGHTS = {
+    "complex_selectors": 2,
+    "universal_selectors": 5,
+    "descendant_heavy_selectors": 3,
+    "animated_layout_properties": 10,
+    "hover_transforms": 3,
+    "box_shadows": 1,
+    "gradients": 2,
+    "filters": 5,
+    "broad_paint_properties": 10,
+    "important_overrides": 0.5,
+}
+
+# Desk containers that cover most of the screen; paint effects here are
+# repainted on every scroll and resize
+BROAD_DESK_SELECTORS = {
+    "html", "body", ":root",
+    ".layout-main", ".layout-main-section", ".layout-side-section",
+    ".page-container", ".page-head", ".page-body", ".page-content",
+    ".main-section", ".navbar", ".desk-sidebar", ".content",
+}
+
+# Properties that trigger layout when they change
+LAYOUT_PROPERTIES = {
+    "all", "width", "height", "min-width", "min-height", "max-width", "max-height",
+    "top", "right", "bottom", "left", "margin", "margin-top", "margin-right",
+    "margin-bottom", "margin-left", "padding", "padding-top", "padding-right",
+    "padding-bottom", "padding-left", "border-width", "font-size", "line-height",
+    "flex", "flex-basis", "grid-template-columns", "grid-template-rows",
+}
+
+PAINT_PROPERTY_PATTERNS = {
+    "box_shadows": r'^(box-shadow|text-shadow)$',
+    "filters": r'^(filter|backdrop-filter)$',
+}
+
+VENDOR_PREFIX_PATTERN = r'^-(webkit|moz|ms|o)-'
+
+
+def unprefixed(name):
+    """
+    Drops the vendor prefix of a property or at-rule name, e.g.
+    "-webkit-transition" gives "transition", "@-moz-keyframes" gives "@keyframes"
+    """
+    if name.startswith('@'):
+        return '@' + re.sub(VENDOR_PREFIX_PATTERN, '', name[1:])
+    return re.sub(VENDOR_PREFIX_PATTERN, '', name)
+
+
+def strip_css_comments(css_content):
+    return re.sub(r'/\*.*?\*/', '', css_content or "", flags=re.DOTALL)
+
+
+def parse_declarations(block):
+    """
+    Splits a declaration block into (property, value, is_important) tuples,
+    with vendor prefixes removed from the property names
+    """
+    declarations = []
+
+    for declaration in block.split(';'):
+        prop, sep, value = declaration.partition(':')
+        prop = unprefixed(prop.strip().lower())
+        if not sep or not prop:
+            continue
+
+        value = value.strip()
+        important = bool(re.search(r'!\s*important\s*$', value, re.IGNORECASE))
+        value = re.sub(r'!\s*important\s*$', '', value, flags=re.IGNORECASE).strip()
+        declarations.append((prop, value, important))
+
+    return declarations
+
+
+def parse_css_rules(css_content):
+    """
+    Parses CSS into style rules, following @media/@supports nesting.
+
+    Returns:
+        tuple: (rules, keyframes) where rules is a list of dicts with
+               "selectors" and "declarations", and keyframes maps every
+               @keyframes name to the set of properties it animates
+    """
+    rules = []
+    keyframes = {}
+    stack = []
+    buffer = ""
+    paren_depth = 0
+    quote = None
+
+    for char in strip_css_comments(css_content):
+        # Braces inside strings or url(...) are not block delimiters
+        if quote:
+            buffer += char
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+            buffer += char
+        elif char == '(':
+            paren_depth += 1
+            buffer += char
+        elif char == ')':
+            paren_depth = max(0, paren_depth - 1)
+            buffer += char
+        elif paren_depth:
+            buffer += char
+        elif char == '{':
+            stack.append(buffer.strip())
+            buffer = ""
+        elif char == '}':
+            if not stack:
+                buffer = ""
+                continue
+
+            prelude = stack.pop()
+            parent = stack[-1] if stack else ""
+
+            if parent.startswith('@') and unprefixed(parent.split(None, 1)[0].lower()) == "@keyframes":
+                name = parent.split(None, 1)[-1].strip()
+                keyframes.setdefault(name, set()).update(
+                    prop for prop, _, _ in parse_declarations(buffer)
+                )
+            elif prelude and not prelude.startswith('@'):
+                rules.append({
+                    "selectors": split_selector_list(prelude),
+                    "declarations": parse_declarations(buffer)
+                })
+
+            buffer = ""
+        elif char == ';' and not stack:
+            # Top level statements such as @import or @charset
+            buffer = ""
+        else:
+            buffer += char
+
+    return rules, keyframes
+
+
+def split_outside_brackets(text, separators):
+    """
+    Splits text on any of the separator characters, ignoring those inside
+    (), [] or quotes. Separators are kept as their own items.
+    """
+    parts = []
+    current = ""
+    depth = 0
+    quote = None
+
+    for char in text:
+        if quote:
+            current += char
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+            current += char
+        elif char in "([":
+            depth += 1
+            current += char
+        elif char in ")]":
+            depth = max(0, depth - 1)
+            current += char
+        elif depth == 0 and char in separators:
+            parts.append(current)
+            parts.append(char)
+            current = ""
+        else:
+            current += char
+
+    parts.append(current)
+    return parts
+
+
+def split_selector_list(prelude):
+    return [
+        part.strip() for part in split_outside_brackets(prelude, ",")
+        if part.strip() and part != ","
+    ]
+
+
+def split_compounds(selector):
+    """
+    Splits a selector into compound selectors and the combinators between them.
+
+    Returns:
+        tuple: (compounds, combinators), e.g. ".a .b > li" gives
+               ([".a", ".b", "li"], [" ", ">"])
+    """
+    compounds = []
+    combinators = []
+    pending = None
+
+    for part in split_outside_brackets(selector, " >+~\t\n"):
+        if part in (">", "+", "~"):
+            pending = part
+        elif part in (" ", "\t", "\n", ""):
+            if compounds and pending is None:
+                pending = " "
+        else:
+            if compounds:
+                combinators.append(pending or " ")
+            compounds.append(part)
+            pending = None
+
+    return compounds, combinators
+
+
+def has_universal(selector):
+    # Ignore "*" inside attribute selectors ([class*=x]) and pseudo arguments
+    return "*" in re.sub(r'\[[^\]]*\]|\([^)]*\)', '', selector)
+
+
+def is_type_or_universal(compound):
+    compound = re.sub(r'::?[\w-]+(\([^)]*\))?', '', compound)
+    return not re.search(r'[.#\[]', compound)
+
+
+def compound_tokens(compound):
+    """
+    Returns the type, class and :root tokens of a compound selector, ignoring
+    attribute selectors and pseudo-class arguments, e.g.
+    'body.dark[data-x="a.b"]:not(.y)' gives {"body", ".dark"}
+    """
+    stripped = re.sub(r'\[[^\]]*\]|\([^)]*\)', '', compound)
+    tokens = set(re.findall(r'\.[\w-]+', stripped))
+
+    type_match = re.match(r'[a-zA-Z][\w-]*', stripped)
+    if type_match:
+        tokens.add(type_match.group(0).lower())
+    if re.search(r':root\b', stripped):
+        tokens.add(":root")
+
+    return tokens
+
+
+def is_broad_selector(selector):
+    compounds, _ = split_compounds(selector)
+    if not compounds:
+        return False
+
+    # Bare type selectors are already scored by descendant_heavy_selectors
+    key = re.sub(r'::?[\w-]+(\([^)]*\))?', '', compounds[-1])
+    return key == "*" or bool(compound_tokens(compounds[-1]) & BROAD_DESK_SELECTORS)
+
+
+def transitioned_properties(prop, value):
+    """
+    Returns the properties animated by a transition declaration.
+    A transition without an explicit property animates `all`.
+    """
+    if prop == "transition-property":
+        return {unprefixed(item.strip().lower()) for item in value.split(",")}
+
+    animated = set()
+    for item in split_outside_brackets(value, ","):
+        if item == ",":
+            continue
+        tokens = item.strip().lower().split()
+        names = [
+            token for token in tokens
+            if not re.match(r'^[\d.]+m?s$', token)
+            and not re.match(r'^(ease|ease-in|ease-out|ease-in-out|linear|step-start|step-end)$', token)
+            and not token.startswith(("cubic-bezier", "steps"))
+        ]
+        animated.add(unprefixed(names[0]) if names else "all")
+    return animated
+
+
+def analyze_css(css_content, max_selector_depth=DEFAULT_MAX_SELECTOR_DEPTH):
+    """
+    Collects render cost metrics for a CSS string and computes its score
+    """
+    metrics = {name: 0 for name in COST_WEIGHTS}
+    metrics.update({
+        "size_bytes": len((css_content or "").encode("utf-8")),
+        "rules": 0,
+        "selectors": 0,
+        "declarations": 0,
+        "max_selector_depth": 0,
+    })
+
+    rules, keyframes = parse_css_rules(css_content)
+    metrics["rules"] = len(rules)
+
+    for rule in rules:
+        selectors = rule["selectors"]
+        declarations = rule["declarations"]
+        broad = any(is_broad_selector(selector) for selector in selectors)
+        hover = any(":hover" in selector for selector in selectors)
+
+        metrics["selectors"] += len(selectors)
+        metrics["declarations"] += len(declarations)
+
+        for selector in selectors:
+            compounds, combinators = split_compounds(selector)
+            metrics["max_selector_depth"] = max(metrics["max_selector_depth"], len(compounds))
+
+            if len(compounds) > max_selector_depth:
+                metrics["complex_selectors"] += 1
+            if has_universal(selector):
+                metrics["universal_selectors"] += 1
+            if " " in combinators and compounds and is_type_or_universal(compounds[-1]):
+                metrics["descendant_heavy_selectors"] += 1
+
+        for prop, value, important in declarations:
+            if important:
+                metrics["important_overrides"] += 1
+
+            if prop.startswith("--"):
+                continue
+
+            paint = False
+            if "gradient(" in value.lower():
+                metrics["gradients"] += 1
+                paint = True
+            for metric, pattern in PAINT_PROPERTY_PATTERNS.items():
+                if re.match(pattern, prop) and value.lower() != "none":
+                    metrics[metric] += 1
+                    paint = True
+
+            if paint and broad:
+                metrics["broad_paint_properties"] += 1
+
+            if prop in ("transition", "transition-property"):
+                if transitioned_properties(prop, value) & LAYOUT_PROPERTIES:
+                    metrics["animated_layout_properties"] += 1
+            elif prop in ("animation", "animation-name"):
+                for name, animated in keyframes.items():
+                    if re.search(rf'(^|[\s,]){re.escape(name)}($|[\s,])', value) and animated & LAYOUT_PROPERTIES:
+                        metrics["animated_layout_properties"] += 1
+
+            if hover and prop in ("transform", "transition"):
+                metrics["hover_transforms"] += 1
+
+    metrics["render_cost"] = round(sum(
+        metrics[name] * weight for name, weight in COST_WEIGHTS.items()
+    ), 1)
+
+    return metrics
+
+
+def load_theme_css(theme_path):
+    """
+    Reads the CSS of a theme folder the same way as user_extension:
+    the separate .css file first, then css_content in the JSON
+    """
+    theme_folder = os.path.basename(os.path.normpath(theme_path))
+    css_file = os.path.join(theme_path, f"{theme_folder}.css")
+    json_file = os.path.join(theme_path, f"{theme_folder}.json")
+
+    if os.path.exists(css_file):
+        with open(css_file, "r", encoding="utf-8") as f:
+            return f.read()
+
+    if os.path.exists(json_file):
+        with open(json_file, "r", encoding="utf-8") as f:
+            return json.load(f).get("css_content", "")
+
+    return ""
+
+
+def check_theme_budgets(metrics, max_css_kb=DEFAULT_MAX_CSS_KB, max_cost=DEFAULT_MAX_COST):
+    """
+    Returns the list of budgets the theme exceeds (empty when within budget)
+    """
+    violations = []
+
+    if max_css_kb is not None and metrics["size_bytes"] > max_css_kb * 1024:
+        violations.append(f"CSS size {metrics['size_bytes'] / 1024:.1f} KB > {max_css_kb} KB")
+    if max_cost is not None and metrics["render_cost"] > max_cost:
+        violations.append(f"render cost {metrics['render_cost']} > {max_cost}")
+
+    return violations
+
+
+def analyze_themes(path, max_css_kb=DEFAULT_MAX_CSS_KB, max_cost=DEFAULT_MAX_COST,
+                   warn_cost=DEFAULT_WARN_COST, max_selector_depth=DEFAULT_MAX_SELECTOR_DEPTH):
+    """
+    Analyzes a single theme folder or every theme folder inside `path`.
+    Themes without desk CSS (website themes using theme_scss) are skipped.
+    A theme whose files cannot be read or parsed gets a report with "error"
+    instead of metrics.
+
+    Returns:
+        list: One report dict per theme with metrics and budget violations
+    """
+    theme_folder = os.path.basename(os.path.normpath(path))
+    if os.path.exists(os.path.join(path, f"{theme_folder}.json")):
+        theme_paths = [path]
+    else:
+        theme_paths = [
+            os.path.join(path, name) for name in sorted(os.listdir(path))
+            if os.path.isdir(os.path.join(path, name)) and name != "__pycache__"
+        ]
+
+    reports = []
+    for theme_path in theme_paths:
+        theme = os.path.basename(os.path.normpath(theme_path))
+
+        try:
+            css_content = load_theme_css(theme_path)
+        except (OSError, UnicodeDecodeError, ValueError, AttributeError) as e:
+            # ValueError covers invalid JSON, AttributeError a JSON that is not an object
+            reports.append({"theme": theme, "error": f"{type(e).__name__}: {e}"})
+            continue
+
+        if not css_content:
+            continue
+
+        metrics = analyze_css(css_content, max_selector_depth)
+        reports.append({
+            "theme": theme,
+            "metrics": metrics,
+            "expensive": warn_cost is not None and metrics["render_cost"] > warn_cost,
+            "violations": check_theme_budgets(metrics, max_css_kb, max_cost)
+        })
+
+    return reports
+
+
+def print_reports(reports):
+    for report in reports:
+        if report.get("error"):
+            print(f"{report['theme']}: [ERROR] {report['error']}")
+            continue
+
+        metrics = report["metrics"]
+        if report["violations"]:
+            status = "OVER BUDGET"
+        elif report["expensive"]:
+            status = "expensive"
+        else:
+            status = "ok"
+        print(f"{report['theme']}: render cost {metrics['render_cost']}, "
+              f"{metrics['size_bytes'] / 1024:.1f} KB [{status}]")
+        for name in COST_WEIGHTS:
+            if metrics[name]:
+                print(f"    {name}: {metrics[name]}")
+        for violation in report["violations"]:
+            print(f"    ✗ {violation}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score desk theme CSS for render cost")
+    parser.add_argument("path", help="theme folder or directory containing theme folders")
+    parser.add_argument("--max-css-kb", type=float, default=DEFAULT_MAX_CSS_KB,
+                        help=f"CSS size budget per theme in KB (default: {DEFAULT_MAX_CSS_KB})")
+    parser.add_argument("--max-cost", type=float, default=DEFAULT_MAX_COST,
+                        help=f"render cost budget per theme (default: {DEFAULT_MAX_COST})")
+    parser.add_argument("--warn-cost", type=float, default=DEFAULT_WARN_COST,
+                        help=f"render cost above which a theme is flagged as expensive (default: {DEFAULT_WARN_COST})")
+    parser.add_argument("--max-selector-depth", type=int, default=DEFAULT_MAX_SELECTOR_DEPTH,
+                        help="compound selectors allowed before a selector counts as complex")
+    parser.add_argument("--json", action="store_true", help="print the reports as JSON")
+    options = parser.parse_args(argv)
+
+    try:
+        reports = analyze_themes(options.path, options.max_css_kb, options.max_cost,
+                                 options.warn_cost, options.max_selector_depth)
+    except OSError as e:
+        print(f"Error: cannot read {options.path}: {e}", file=sys.stderr)
+        return EXIT_ANALYZER_ERROR
+
+    if options.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        print_reports(reports)
+
+    if any(report.get("error") for report in reports):
+        return EXIT_ANALYZER_ERROR
+    if any(report["violations"] for report in reports):
+        return EXIT_BUDGET_EXCEEDED
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())